@@ -1,64 +1,560 @@
 # admin_panel.py
 """
 Admin Panel - Analytics and Management Dashboard
-Add this as a new menu item in app.py
+Rendered from the "Admin Panel" menu item in app.py
 """
 
+import csv
+import codecs
+import html
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from database.db import get_conn
+import plotly.graph_objects as go
+from database.db import read_conn
+from database.export import write_parquet
+from query_analytics import log_nlu_query
+from nlu_engine.nlu_router import model_version
+
+try:
+    import orjson  # faster intents.json load/save when available
+except ImportError:
+    orjson = None
+
+# ---------------- PATHS FOR USER QUERY ----------------
+INTENTS_PATH = "nlu_engine/intents.json"
+MODEL_DIR = "models/intent_model"
+LOG_PATH = os.path.join("models", "training.log")
+os.makedirs("models", exist_ok=True)
+
+# Fallback entity patterns (used when EntityExtractor is unavailable)
+_AMOUNT_RE = re.compile(r'(\b(?:₹|rs\.?|Rs\.?|\$)\s*\d[\d,.]*)')
+_ACC_RE = re.compile(r'\b\d{4,16}\b')
+
+# Rows shown in the "Recent Chat Activity" table (roughly one screen)
+RECENT_ROWS = 50
+
+# Rows fetched per batch when building export files
+EXPORT_CHUNK_ROWS = 10_000
+
+
+# ---------------- CACHED QUERIES ----------------
+# Every cached helper takes a fingerprint (max id + row count of the source
+# table) so Streamlit reruns reuse the cached result until new rows are logged.
+
+def _read_df(sql, params=None):
+    with read_conn() as conn:
+        return pd.read_sql(sql, conn, params=params)
+
+
+def _table_fingerprint(conn, table):
+    return tuple(conn.execute(
+        f"SELECT COALESCE(MAX(id), 0), COUNT(*) FROM {table}"
+    ).fetchone())
+
+
+@st.cache_data(ttl=30)
+def _chat_metrics(fingerprint):
+    # One table scan for all four headline metrics
+    with read_conn() as conn:
+        return conn.execute("""
+            SELECT COUNT(*),
+                   COALESCE(AVG(CASE WHEN success=1 THEN 100.0 ELSE 0 END), 0),
+                   COALESCE(SUM(CASE WHEN confidence < 0.7 THEN 1 ELSE 0 END), 0),
+                   COUNT(DISTINCT predicted_intent)
+            FROM chat_history
+        """).fetchone()
+
+
+@st.cache_data(ttl=30)
+def _intent_distribution(fingerprint):
+    return _read_df("""
+        SELECT predicted_intent, COUNT(*) as count
+        FROM chat_history 
+        WHERE predicted_intent IS NOT NULL
+        GROUP BY predicted_intent 
+        ORDER BY count DESC
+    """)
+
+
+@st.cache_data(ttl=30)
+def _success_by_intent(fingerprint):
+    return _read_df("""
+        SELECT predicted_intent,
+               ROUND(AVG(CASE WHEN success=1 THEN 100 ELSE 0 END), 1) as success_pct
+        FROM chat_history
+        WHERE predicted_intent IS NOT NULL
+        GROUP BY predicted_intent
+    """)
+
+
+@st.cache_data(ttl=30)
+def _recent_chats(fingerprint):
+    return _read_df("""
+        SELECT user_query, 
+               predicted_intent, 
+               ROUND(confidence*100,0)||'%' as confidence,
+               CASE WHEN success=1 THEN '✅' ELSE '❌' END as success,
+               substr(timestamp, 1, 16) as timestamp
+        FROM chat_history 
+        ORDER BY id DESC 
+        LIMIT ?
+    """, params=(RECENT_ROWS,))
+
+
+@st.cache_data(ttl=30)
+def _nlu_metrics(fingerprint):
+    with read_conn() as conn:
+        return conn.execute("""
+            SELECT COUNT(*),
+                   COUNT(DISTINCT predicted_intent),
+                   COALESCE(SUM(CASE WHEN confidence < 0.8 THEN 1 ELSE 0 END), 0)
+            FROM nlu_history
+        """).fetchone()
+
+
+@st.cache_data(ttl=30)
+def _confidence_distribution(fingerprint):
+    return _read_df("""
+        SELECT ROUND(confidence*100,0) as conf_pct, COUNT(*) as count
+        FROM nlu_history 
+        WHERE confidence IS NOT NULL
+        GROUP BY conf_pct 
+        ORDER BY conf_pct
+    """)
+
+
+@st.cache_data(ttl=30)
+def _recent_nlu(fingerprint):
+    return _read_df("""
+        SELECT user_query as "Query", 
+               predicted_intent as "Intent", 
+               ROUND(confidence*100,0)||'%' as "Confidence",
+               substr(timestamp, 1, 10) as "Date"
+        FROM nlu_history 
+        WHERE predicted_intent IS NOT NULL
+        ORDER BY id DESC 
+        LIMIT 20
+    """)
+
+
+def _table_columns(table):
+    with read_conn() as conn:
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _select_columns_sql(table, columns):
+    cols = ", ".join(f'"{c}"' for c in columns)
+    return f"SELECT {cols} FROM {table}"
+
+
+@st.cache_data(ttl=30)
+def _export_csv(table, columns, fingerprint):
+    # Stream cursor rows straight into the CSV writer (no DataFrame copy)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    with read_conn() as conn:
+        cur = conn.execute(_select_columns_sql(table, columns))
+        writer.writerow([d[0] for d in cur.description])
+        while True:
+            rows = cur.fetchmany(EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            writer.writerows(rows)
+    return buf.getvalue()
+
+
+@st.cache_data(ttl=30)
+def _export_parquet(table, columns, fingerprint):
+    # Schema comes from the declared column types, not the first chunk's rows
+    buf = io.BytesIO()
+    with read_conn() as conn:
+        write_parquet(conn, table, columns, buf, chunk_rows=EXPORT_CHUNK_ROWS)
+    return buf.getvalue()
+
+
+def _export_section(label, table, fingerprint, export_format):
+    all_columns = _table_columns(table)
+    columns = st.multiselect(
+        f"Columns ({table})",
+        all_columns,
+        default=all_columns,
+        key=f"export_cols_{table}"
+    )
+    if not columns:
+        st.info("ℹ️ Select at least one column to export.")
+        return
+
+    if export_format == "parquet":
+        try:
+            data = _export_parquet(table, tuple(columns), fingerprint)
+        except ImportError:
+            st.error("❌ Parquet export requires pyarrow (pip install pyarrow).")
+            return
+        st.download_button(label, data, f"{table}.parquet", "application/octet-stream")
+    else:
+        data = _export_csv(table, tuple(columns), fingerprint)
+        st.download_button(label, data, f"{table}.csv", "text/csv")
+
+
+# ---------------- UTILITY FUNCTIONS FOR USER QUERY ----------------
+@st.cache_data
+def _read_intents_file(mtime_ns):
+    if orjson is not None:
+        return orjson.loads(Path(INTENTS_PATH).read_bytes())
+    with open(INTENTS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_intents_file():
+    # Re-parse only when the file changes on disk
+    if not os.path.exists(INTENTS_PATH):
+        return {"intents": []}
+    return _read_intents_file(os.stat(INTENTS_PATH).st_mtime_ns)
+
+
+def save_intents_file(data):
+    if orjson is not None:
+        Path(INTENTS_PATH).write_bytes(
+            orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        )
+        return
+    with open(INTENTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def model_exists():
+    return os.path.isdir(MODEL_DIR) and any(Path(MODEL_DIR).iterdir())
+
+
+def start_training_subprocess(epochs, batch_size, lr):
+    python_exe = sys.executable
+    script_path = os.path.join("nlu_engine", "train_intent.py")
+    cmd = [
+        python_exe, script_path,
+        "--intents", INTENTS_PATH,
+        "--output_dir", MODEL_DIR,
+        "--epochs", str(int(epochs)),
+        "--batch_size", str(int(batch_size)),
+        "--lr", str(lr)
+    ]
+    logf = open(LOG_PATH, "a", encoding="utf-8")
+    proc = subprocess.Popen(cmd, stdout=logf, stderr=subprocess.STDOUT, text=True)
+    return proc
+
+
+@st.cache_resource(max_entries=1)
+def _get_intent_classifier(version):
+    from nlu_engine.infer_intent import IntentClassifier
+    # Same settings as the chatbot's classifier, so the visualizer shows the
+    # intents and scores production actually predicts
+    return IntentClassifier(model_dir=MODEL_DIR)
+
+
+@st.cache_resource
+def _get_entity_extractor():
+    from nlu_engine.entity_extractor import EntityExtractor
+    return EntityExtractor()
+
+
+def read_log_tail(max_chars=16_000):
+    """Append only the bytes written since the last poll and keep a bounded tail"""
+    if not os.path.exists(LOG_PATH):
+        return st.session_state.get("log_tail", "")
+    with open(LOG_PATH, "rb") as f:
+        f.seek(st.session_state.get("log_offset", 0))
+        chunk = f.read()
+        st.session_state.log_offset = f.tell()
+    # Incremental: a multi-byte character (tqdm bars) split across two polls
+    # is held back until its remaining bytes arrive
+    decoder = st.session_state.get("log_decoder")
+    if decoder is None:
+        decoder = st.session_state.log_decoder = codecs.getincrementaldecoder("utf-8")("ignore")
+    tail = st.session_state.get("log_tail", "") + decoder.decode(chunk)
+    st.session_state.log_tail = tail[-max_chars:]
+    return st.session_state.log_tail
+
+
+def extract_entities_safe(text):
+    try:
+        return _get_entity_extractor().extract(text)
+    except Exception as e:
+        ents = []
+        m = _AMOUNT_RE.search(text)
+        if m:
+            ents.append({"entity": "AMOUNT", "value": m.group(1)})
+        m2 = _ACC_RE.search(text)
+        if m2:
+            ents.append({"entity": "ACCOUNT_NUMBER", "value": m2.group(0)})
+        text_lower = text.lower()
+        if "savings" in text_lower:
+            ents.append({"entity": "ACCOUNT_TYPE", "value": "savings"})
+        if "checking" in text_lower or "current" in text_lower:
+            ents.append({"entity": "ACCOUNT_TYPE", "value": "checking"})
+        return ents
+
+
+def predict_with_trained_model(text, top_k=3):
+    if not model_exists():
+        raise FileNotFoundError("Trained model not found. Train the model first.")
+    return _get_intent_classifier(model_version()).predict(text, top_k=top_k)
+
+
+# ---------------- TABS ----------------
+@st.fragment
+def chat_analytics_tab(chat_fp):
+    """Chat Analytics tab (reruns on its own, not with the whole page)"""
+    st.subheader("📊 Chat Analytics")
+
+    # Intent Distribution Pie Chart
+    intent_df = _intent_distribution(chat_fp)
+
+    if not intent_df.empty:
+        col_chart1, col_chart2 = st.columns(2)
+
+        with col_chart1:
+            fig_pie = go.Figure(go.Pie(
+                labels=intent_df['predicted_intent'],
+                values=intent_df['count'],
+                textposition='inside',
+                textinfo='percent+label'
+            ))
+            fig_pie.update_layout(title="🎯 Intent Distribution", uirevision='static')
+            st.plotly_chart(fig_pie, width='stretch')
+
+        with col_chart2:
+            # Success Rate by Intent
+            success_df = _success_by_intent(chat_fp)
+
+            # Native Vega-Lite bar chart is much lighter than Plotly for a few bars
+            st.markdown("##### ✅ Success Rate by Intent")
+            st.bar_chart(success_df.set_index('predicted_intent')['success_pct'])
+
+    # Recent Chat Activity
+    st.markdown("### 💬 Recent Chat Activity")
+    recent_df = _recent_chats(chat_fp)
+    st.dataframe(recent_df, width='stretch')
+
+
+def user_query_tab():
+    """Intents editor + training (left) and NLU Visualizer (right)"""
+    st.markdown("## 🔍 User Query - NLU Visualizer")
+
+    # Layout: Left (Intents Editor) + Right (NLU Visualizer)
+    left_col, right_col = st.columns([1.05, 1.45])
+
+    # LEFT: INTENTS EDITOR + TRAINING
+    with left_col:
+        st.subheader("📝 Intents (edit & add)")
+        intents_data = load_intents_file()
+        by_name = {it.get("name"): it for it in intents_data.get("intents", [])}
+
+        filtered_intents = [it for it in intents_data.get("intents", []) if it.get("name") != "greet"]
+
+        for i, intent in enumerate(filtered_intents):
+            with st.expander(f"{intent['name']} ({len(intent.get('examples', []))} examples)"):
+                st.write("**Examples:**")
+                for ex in intent.get("examples", []):
+                    st.write("-", ex)
+                new_ex = st.text_input(f"Add example to {intent['name']}", key=f"add_{i}")
+                if st.button(f"➕ Add example", key=f"btn_add_{i}"):
+                    if new_ex.strip():
+                        by_name[intent["name"]].setdefault("examples", []).append(new_ex.strip())
+                        save_intents_file(intents_data)
+                        st.success("✅ Example added!")
+                        st.rerun()
+                    else:
+                        st.warning("⚠️ Enter example text first.")
+
+        st.markdown("---")
+        st.subheader("➕ Create New Intent")
+        new_intent_name = st.text_input("Intent name", key="new_intent_name")
+        new_intent_examples = st.text_area("Examples (one per line)", key="new_intent_examples", height=120)
+        if st.button("🚀 Create Intent"):
+            if new_intent_name.strip() and new_intent_examples.strip():
+                new_obj = {
+                    "name": new_intent_name.strip(), 
+                    "examples": [e.strip() for e in new_intent_examples.splitlines() if e.strip()]
+                }
+                intents_data.setdefault("intents", []).append(new_obj)
+                save_intents_file(intents_data)
+                st.success(f"✅ Intent '{new_intent_name}' created!")
+                st.rerun()
+            else:
+                st.warning("⚠️ Provide intent name and examples.")
+
+        st.markdown("---")
+        st.subheader("🎯 Train Model")
+        if model_exists():
+            st.markdown("<span style='color:green;font-weight:bold;'>✅ Trained model found</span>", unsafe_allow_html=True)
+        else:
+            st.info("ℹ️ No trained model found")
+
+        epochs = st.number_input("Epochs", value=2, step=1, min_value=1)
+        batch_size = st.number_input("Batch size", value=8, step=1, min_value=1)
+        lr = st.number_input("Learning rate", value=2e-5, format="%.8f")
+
+        if st.button("🚀 Start Training"):
+            proc = st.session_state.get("train_proc")
+            if proc is not None and proc.poll() is None:
+                st.warning("⚠️ Training already running.")
+            else:
+                try:
+                    try: 
+                        open(LOG_PATH, "w", encoding="utf-8").close()
+                    except: 
+                        pass
+                    proc = start_training_subprocess(epochs, batch_size, lr)
+                    st.session_state.train_proc = proc
+                    st.session_state.proc_start_time = time.time()
+                    st.session_state.log_offset = 0
+                    st.session_state.log_decoder = None
+                    st.session_state.log_tail = ""
+                    st.success(f"✅ Training started (pid={proc.pid}).")
+                except Exception as e:
+                    st.error("❌ Failed to start training.")
+                    st.exception(e)
+
+        proc = st.session_state.get("train_proc")
+        if proc is not None:
+            if proc.poll() is None:
+                elapsed = int(time.time() - (st.session_state.proc_start_time or time.time()))
+                st.info(f"⏳ Training running ({elapsed}s)...")
+                st.button("🔄 Refresh log")
+            else:
+                st.success(f"✅ Training finished (exit code {proc.returncode}).")
+            st.code(read_log_tail() or "(no output yet)", language="text")
+
+    # RIGHT: NLU VISUALIZER
+    with right_col:
+        nlu_visualizer_panel()
+
+
+@st.fragment
+def nlu_visualizer_panel():
+    """NLU Visualizer column; clicking Analyze reruns only this fragment"""
+
+    st.subheader("🔍 NLU Visualizer")
+    query = st.text_area(
+        "User Query:", 
+        height=120, 
+        value='I want to transfer $500 from savings to checking'
+    )
+
+    top_k = st.number_input("Top intents", min_value=1, max_value=6, value=3, step=1)
+
+    if st.button("🔎 Analyze"):
+        if not model_exists():
+            st.error("❌ No trained model. Train first.")
+        else:
+            try:
+                with st.spinner("🔄 Running model..."):
+                    preds = predict_with_trained_model(query, top_k=top_k)
+
+                    if preds:
+                        top_intent = preds[0].get("intent")
+                        top_confidence = preds[0].get("score", 0.0)
+                        log_nlu_query(query, top_intent, top_confidence)
+                        st.success("✅ Logged to Query Analytics!")
+
+            except Exception as e:
+                st.error("❌ Prediction failed.")
+                st.exception(e)
+                preds = []
+
+            entities = extract_entities_safe(query)
+
+            res_left, res_right = st.columns([1, 1])
+
+            with res_left:
+                st.markdown("#### 🎯 Intent Recognition")
+                if not preds:
+                    st.info("ℹ️ No predictions.")
+                else:
+                    # Build all cards first and send them as a single element
+                    cards = []
+                    for p in preds:
+                        name = p.get("intent")
+                        score = float(p.get("score", 0.0))
+                        display_score = max(0.01, min(1.0, score))
+                        cards.append(
+                            f'<div class="intent-card">'
+                            f'<div class="intent-name">{html.escape(name.replace("_", " ").title())}</div>'
+                            f'<div style="min-width:88px;display:flex;justify-content:flex-end;">'
+                            f'<div class="intent-score">{display_score:.2f}</div>'
+                            f'</div></div>'
+                        )
+                    st.markdown("".join(cards), unsafe_allow_html=True)
+
+            with res_right:
+                st.markdown("#### 🏷️ Entities")
+                if not entities:
+                    st.info("ℹ️ No entities.")
+                else:
+                    cards = []
+                    for e in entities:
+                        ent_name = e.get("entity")
+                        ent_value = e.get("value")
+                        cards.append(
+                            f'<div class="entity-card">'
+                            f'<div class="entity-icon">🏷️</div>'
+                            f'<div><div class="intent-name">{html.escape(str(ent_name))}</div>'
+                            f'<div class="small-muted">{html.escape(str(ent_value))}</div></div>'
+                            f'</div>'
+                        )
+                    st.markdown("".join(cards), unsafe_allow_html=True)
 
 
 def page_admin_panel():
     st.title("🔧 Admin Dashboard")
 
-    # CSS Styling
+    # Session state for training
+    if "train_proc" not in st.session_state:
+        st.session_state.train_proc = None
+        st.session_state.proc_start_time = None
+
+    # CSS Styling (plain white background)
     st.markdown("""
     <style>
     .stApp {
-        background: linear-gradient(135deg, #1e3a8a 0%, #3b82f6 25%, #10b981 50%, #f59e0b 75%, #f97316 100%) !important;
+        background: #ffffff !important;
     }
     
     [data-testid="metric-container"] {
-        background: rgba(17, 24, 39, 0.95) !important;
-        backdrop-filter: blur(25px) !important;
-        border: 1px solid rgba(255, 255, 255, 0.3) !important;
-        border-radius: 24px !important;
-        padding: 24px !important;
+        background: rgba(255, 255, 255, 0.95) !important;
+        border: 1px solid #e5e7eb !important;
+        border-radius: 16px !important;
+        padding: 20px !important;
+        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1) !important;
     }
     
-    [data-testid="stMetricLabel"] { 
-        color: #f1f5f9 !important; 
-        font-weight: 600 !important; 
+    [data-testid="stMetricLabel"] {
+        color: #374151 !important;
+        font-weight: 600 !important;
     }
     
-    [data-testid="stMetricValue"] { 
-        color: #ffffff !important; 
-        text-shadow: 0 2px 12px rgba(255,255,255,0.9) !important;
-        font-size: 2.4em !important; 
-        font-weight: 800 !important; 
+    [data-testid="stMetricValue"] {
+        color: #111827 !important;
+        font-size: 32px !important;
+        font-weight: 800 !important;
     }
     </style>
     """, unsafe_allow_html=True)
 
-    # Database connection
-    conn = get_conn()
-    
+    # Database connection (only used for the cheap cache fingerprints)
+    with read_conn() as conn:
+        chat_fp = _table_fingerprint(conn, "chat_history")
+        nlu_fp = _table_fingerprint(conn, "nlu_history")
+
     # Metrics
-    total = pd.read_sql("SELECT COUNT(*) FROM chat_history", conn).iloc[0, 0]
-    success_rate = pd.read_sql(
-        "SELECT AVG(CASE WHEN success=1 THEN 1 ELSE 0 END)*100 FROM chat_history", 
-        conn
-    ).iloc[0, 0] or 0
-    low_conf = pd.read_sql(
-        "SELECT COUNT(*) FROM chat_history WHERE confidence < 0.7", 
-        conn
-    ).iloc[0, 0]
-    num_intents = pd.read_sql(
-        "SELECT COUNT(DISTINCT predicted_intent) FROM chat_history WHERE predicted_intent IS NOT NULL", 
-        conn
-    ).iloc[0, 0]
+    total, success_rate, low_conf, num_intents = _chat_metrics(chat_fp)
 
     # Display metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -70,140 +566,51 @@ def page_admin_panel():
     st.markdown("---")
 
     # Tabs
-    tab1, tab2, tab3 = st.tabs(["📊 Chat Analytics", "🔍 Query Analytics", "📤 Export Logs"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Chat Analytics", "🔍 User Query", "📈 Query Analytics", "📤 Export Logs"])
 
     with tab1:
-        st.subheader("📊 Chat Analytics")
-
-        # Intent Distribution Pie Chart
-        intent_df = pd.read_sql("""
-            SELECT predicted_intent, COUNT(*) as count
-            FROM chat_history 
-            WHERE predicted_intent IS NOT NULL
-            GROUP BY predicted_intent 
-            ORDER BY count DESC
-        """, conn)
-
-        if not intent_df.empty:
-            col_chart1, col_chart2 = st.columns(2)
-            
-            with col_chart1:
-                fig_pie = px.pie(
-                    intent_df, 
-                    values='count', 
-                    names='predicted_intent',
-                    title="🎯 Intent Distribution"
-                )
-                fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-                st.plotly_chart(fig_pie, use_container_width=True)
-
-            with col_chart2:
-                # Success Rate by Intent
-                success_df = pd.read_sql("""
-                    SELECT predicted_intent,
-                           ROUND(AVG(CASE WHEN success=1 THEN 100 ELSE 0 END), 1) as success_pct
-                    FROM chat_history
-                    WHERE predicted_intent IS NOT NULL
-                    GROUP BY predicted_intent
-                """, conn)
-                
-                fig_bar = px.bar(
-                    success_df,
-                    x='predicted_intent',
-                    y='success_pct',
-                    title="✅ Success Rate by Intent",
-                    color='success_pct',
-                    color_continuous_scale='Viridis'
-                )
-                st.plotly_chart(fig_bar, use_container_width=True)
-
-        # Recent Chat Activity
-        st.markdown("### 💬 Recent Chat Activity")
-        recent_df = pd.read_sql("""
-            SELECT user_query, 
-                   predicted_intent, 
-                   ROUND(confidence*100,0)||'%' as confidence,
-                   CASE WHEN success=1 THEN '✅' ELSE '❌' END as success,
-                   substr(timestamp, 1, 16) as timestamp
-            FROM chat_history 
-            ORDER BY id DESC 
-            LIMIT 100
-        """, conn)
-        st.dataframe(recent_df, use_container_width=True)
+        chat_analytics_tab(chat_fp)
 
     with tab2:
+        user_query_tab()
+
+    with tab3:
         st.subheader("🔍 Query Analytics")
 
         # NLU History Metrics
         col1, col2, col3 = st.columns(3)
-        nlu_total = pd.read_sql("SELECT COUNT(*) FROM nlu_history", conn).iloc[0, 0]
-        nlu_intents = pd.read_sql(
-            "SELECT COUNT(DISTINCT predicted_intent) FROM nlu_history WHERE predicted_intent IS NOT NULL", 
-            conn
-        ).iloc[0, 0]
-        nlu_low_conf = pd.read_sql(
-            "SELECT COUNT(*) FROM nlu_history WHERE confidence < 0.8", 
-            conn
-        ).iloc[0, 0]
+        nlu_total, nlu_intents, nlu_low_conf = _nlu_metrics(nlu_fp)
 
         col1.metric("Total NLU Queries", nlu_total)
         col2.metric("Intents Detected", nlu_intents)
         col3.metric("Low Confidence", nlu_low_conf)
 
         # Confidence Distribution
-        conf_df = pd.read_sql("""
-            SELECT ROUND(confidence*100,0) as conf_pct, COUNT(*) as count
-            FROM nlu_history 
-            WHERE confidence IS NOT NULL
-            GROUP BY conf_pct 
-            ORDER BY conf_pct
-        """, conn)
+        conf_df = _confidence_distribution(nlu_fp)
 
         if not conf_df.empty:
-            fig_conf = px.bar(
-                conf_df,
-                x='conf_pct',
-                y='count',
-                title="📊 Confidence Distribution",
-                labels={'conf_pct': 'Confidence %', 'count': 'Queries'}
+            st.markdown("##### 📊 Confidence Distribution")
+            st.bar_chart(
+                conf_df.set_index('conf_pct')['count'],
+                x_label="Confidence %",
+                y_label="Queries"
             )
-            st.plotly_chart(fig_conf, use_container_width=True)
 
         # Recent NLU Queries
         st.markdown("### Recent NLU Queries")
-        nlu_recent = pd.read_sql("""
-            SELECT user_query as "Query", 
-                   predicted_intent as "Intent", 
-                   ROUND(confidence*100,0)||'%' as "Confidence",
-                   substr(timestamp, 1, 10) as "Date"
-            FROM nlu_history 
-            WHERE predicted_intent IS NOT NULL
-            ORDER BY id DESC 
-            LIMIT 20
-        """, conn)
-        st.dataframe(nlu_recent, use_container_width=True, hide_index=True)
+        nlu_recent = _recent_nlu(nlu_fp)
+        st.dataframe(nlu_recent, width='stretch', hide_index=True)
 
-    with tab3:
+    with tab4:
         st.subheader("📤 Export Data")
         
+        export_format = st.radio("Format", ["csv", "parquet"], horizontal=True)
+
         # Export Chat History
-        chat_csv = pd.read_sql("SELECT * FROM chat_history", conn).to_csv(index=False)
-        st.download_button(
-            "📥 Export Chat History",
-            chat_csv,
-            "chat_history.csv",
-            "text/csv"
-        )
+        _export_section("📥 Export Chat History", "chat_history", chat_fp, export_format)
 
         # Export NLU History
-        nlu_csv = pd.read_sql("SELECT * FROM nlu_history", conn).to_csv(index=False)
-        st.download_button(
-            "📥 Export NLU History",
-            nlu_csv,
-            "nlu_history.csv",
-            "text/csv"
-        )
+        _export_section("📥 Export NLU History", "nlu_history", nlu_fp, export_format)
 
-    conn.close()
     st.markdown("---")
     st.caption("👨‍💼 Admin Panel | BankBot AI")
@@ -0,0 +1,3 @@
+# conftest.py
+# Root conftest: pytest puts this directory on sys.path, so the tests can
+# import the app packages (nlu_engine, database, ...) with a plain `pytest`
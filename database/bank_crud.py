@@ -38,6 +38,18 @@ def list_accounts():
     conn.close()
     return rows
 
+def list_accounts_excluding(exclude_acc_no):
+    """'user (account)' labels for every account except the sender's"""
+    conn = get_conn()
+    cur = conn.execute(
+        "SELECT COALESCE(user_name, '') || ' (' || account_number || ')' FROM accounts "
+        "WHERE account_number <> ?",
+        (exclude_acc_no,)
+    )
+    receivers = [row[0] for row in cur]
+    conn.close()
+    return receivers
+
 def transfer_money(from_acc, to_acc, amount, password):
     conn = get_conn()
     cur = conn.cursor()
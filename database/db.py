@@ -1,14 +1,211 @@
 
 # database/db.py
 
+import atexit
+import contextlib
+import logging
+import queue
 import sqlite3
+import threading
+import time
 import bcrypt
 from datetime import datetime
 
 DB_NAME = "bankbot.db"
 
+logger = logging.getLogger(__name__)
+
+MMAP_SIZE = 256 * 1024 * 1024
+READ_POOL_SIZE = 4
+
+_writer_conn = None
+_writer_lock = threading.Lock()
+_read_pool = queue.LifoQueue()
+_read_pool_opened = 0
+_read_pool_lock = threading.Lock()
+
+def _tune(conn):
+    # Per-connection settings for the history writer and read pool only;
+    # journal_mode=WAL is persistent (set in init_db)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    return conn
+
 def get_conn():
-    return sqlite3.connect(DB_NAME, check_same_thread=False)
+    # Default synchronous (FULL): money transfers commit through this connection
+    return sqlite3.connect(DB_NAME, check_same_thread=False, cached_statements=256)
+
+def get_writer():
+    """Process-wide autocommit write connection and the lock that serializes its use"""
+    global _writer_conn
+    with _writer_lock:
+        if _writer_conn is None:
+            # journal_mode=WAL is left to init_db: switching it needs an
+            # exclusive lock that would collide with init_db's own DDL
+            conn = sqlite3.connect(
+                DB_NAME, check_same_thread=False, isolation_level=None, cached_statements=256
+            )
+            try:
+                _writer_conn = _tune(conn)
+            except sqlite3.Error:
+                conn.close()
+                raise
+    return _writer_conn, _writer_lock
+
+def _acquire_read():
+    global _read_pool_opened
+    try:
+        return _read_pool.get_nowait()
+    except queue.Empty:
+        pass
+    with _read_pool_lock:
+        if _read_pool_opened < READ_POOL_SIZE:
+            _read_pool_opened += 1
+            conn = sqlite3.connect(
+                DB_NAME, check_same_thread=False, isolation_level=None, cached_statements=256
+            )
+            _tune(conn)
+            conn.execute("PRAGMA cache_size=-20000")
+            return conn
+    # Pool exhausted: wait for another reader to hand one back
+    return _read_pool.get()
+
+@contextlib.contextmanager
+def read_conn():
+    """Borrow a pooled autocommit read connection; returned to the pool on exit"""
+    conn = _acquire_read()
+    try:
+        yield conn
+    finally:
+        _read_pool.put(conn)
+
+def scalar(conn, sql, *args):
+    """Return the first column of the first row of a query"""
+    return conn.execute(sql, args).fetchone()[0]
+
+def _is_busy(e):
+    """SQLITE_BUSY / SQLITE_LOCKED: another connection holds the write lock"""
+    msg = str(e).lower()
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in msg or "busy" in msg)
+
+class HistoryWriter:
+    """Queues history rows and inserts them in batches from a background thread"""
+
+    _STOP = object()
+    RETRIES = 3
+    RETRY_SEC = 0.2
+
+    def __init__(self, insert_sql, max_batch=500, flush_sec=0.1):
+        self.insert_sql = insert_sql
+        self.max_batch = max_batch
+        self.flush_sec = flush_sec
+        self.queue = queue.Queue()
+        self._closed = False
+        self._state_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def log(self, row):
+        """Non-blocking: the row is written by the background thread
+        (synchronously once the writer is closed)"""
+        with self._state_lock:
+            if not self._closed:
+                self.queue.put(row)
+                return
+        self._write_rows([row])
+
+    def flush(self):
+        """Block until every queued row has been written"""
+        self.queue.join()
+
+    def close(self):
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.queue.put(self._STOP)
+        self.thread.join(timeout=5)
+
+    def _next_batch(self):
+        # Wait for the first row, then collect more for up to flush_sec
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_sec
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, rows):
+        conn, lock = get_writer()
+        with lock:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(self.insert_sql, rows)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def _insert_with_retry(self, rows):
+        for attempt in range(self.RETRIES):
+            try:
+                return self._insert(rows)
+            except sqlite3.Error as e:
+                if not _is_busy(e) or attempt == self.RETRIES - 1:
+                    raise
+                time.sleep(self.RETRY_SEC * (attempt + 1))
+
+    def _write_rows(self, rows):
+        """Insert rows as one transaction; on failure, row by row so only the
+        bad rows are lost"""
+        try:
+            self._insert_with_retry(rows)
+            return
+        except sqlite3.Error as e:
+            # Still locked after the retries: splitting the batch won't help
+            if len(rows) == 1 or _is_busy(e):
+                logger.error("Dropped %d history row(s): %s", len(rows), e)
+                return
+            logger.warning("History batch of %d rows failed (%s); retrying row by row", len(rows), e)
+        for row in rows:
+            try:
+                self._insert_with_retry([row])
+            except sqlite3.Error as e:
+                logger.error("Dropped history row: %s", e)
+
+    def _run(self):
+        # The shared writer connection (get_writer) is opened on the first
+        # batch, not at import, so it never races init_db; a locked open is
+        # retried like any busy insert. Its statement cache keeps insert_sql
+        # compiled between batches
+        while True:
+            batch = self._next_batch()
+            rows = [row for row in batch if row is not self._STOP]
+            try:
+                if rows:
+                    self._write_rows(rows)
+            except Exception:
+                logger.exception("History writer failed on a batch of %d rows", len(rows))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if len(rows) != len(batch):
+                break
+
+def _has_json1(cur):
+    try:
+        cur.execute("SELECT json_valid('{}')")
+        return True
+    except sqlite3.OperationalError:
+        return False
 
 def init_db():
     conn = get_conn()
@@ -69,5 +266,90 @@ def init_db():
     )
     """)
 
+    # Indexes for the admin panel filters / group-bys
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ch_intent ON chat_history(predicted_intent)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_ch_conf ON chat_history(confidence)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_nlu_intent ON nlu_history(predicted_intent)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_nlu_conf ON nlu_history(confidence)")
+
+    # Running nlu_history totals kept by triggers, so the analytics metrics
+    # read one row instead of scanning the table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS nlu_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL,
+        low_conf INTEGER NOT NULL
+    )
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS nlu_intents (
+        intent TEXT PRIMARY KEY,
+        cnt INTEGER NOT NULL
+    )
+    """)
+    # First run: backfill from existing rows (same transaction as the triggers)
+    if cur.execute("SELECT 1 FROM nlu_stats").fetchone() is None:
+        # OR IGNORE: another process may run the same first-time backfill
+        cur.execute("""
+        INSERT OR IGNORE INTO nlu_stats (id, total, low_conf)
+        SELECT 1, COUNT(*), COALESCE(SUM(CASE WHEN confidence < 0.7 THEN 1 ELSE 0 END), 0)
+        FROM nlu_history
+        """)
+        if cur.rowcount:
+            cur.execute("DELETE FROM nlu_intents")
+            cur.execute("""
+            INSERT OR IGNORE INTO nlu_intents (intent, cnt)
+            SELECT predicted_intent, COUNT(*) FROM nlu_history
+            WHERE predicted_intent IS NOT NULL
+            GROUP BY predicted_intent
+            """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS nlu_stats_ai AFTER INSERT ON nlu_history
+    BEGIN
+        UPDATE nlu_stats SET
+            total = total + 1,
+            low_conf = low_conf + (CASE WHEN NEW.confidence < 0.7 THEN 1 ELSE 0 END)
+        WHERE id = 1;
+        INSERT INTO nlu_intents (intent, cnt)
+        SELECT NEW.predicted_intent, 1 WHERE NEW.predicted_intent IS NOT NULL
+        ON CONFLICT(intent) DO UPDATE SET cnt = cnt + 1;
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS nlu_stats_ad AFTER DELETE ON nlu_history
+    BEGIN
+        UPDATE nlu_stats SET
+            total = total - 1,
+            low_conf = low_conf - (CASE WHEN OLD.confidence < 0.7 THEN 1 ELSE 0 END)
+        WHERE id = 1;
+        UPDATE nlu_intents SET cnt = cnt - 1 WHERE intent = OLD.predicted_intent;
+        DELETE FROM nlu_intents WHERE intent = OLD.predicted_intent AND cnt <= 0;
+    END
+    """)
+    conn.commit()
+
+    # Entity flags derived from the JSON stored in chat_history.entities
+    # (generated columns need SQLite 3.31+)
+    if sqlite3.sqlite_version_info >= (3, 31) and _has_json1(cur):
+        cols = {row[1] for row in cur.execute("PRAGMA table_xinfo(chat_history)")}
+        if "has_amount" not in cols:
+            try:
+                cur.execute("""
+                ALTER TABLE chat_history ADD COLUMN has_amount INTEGER
+                GENERATED ALWAYS AS (
+                    CASE WHEN json_valid(entities)
+                         THEN json_extract(entities, '$.AMOUNT') IS NOT NULL
+                         ELSE 0 END
+                ) VIRTUAL
+                """)
+            except sqlite3.OperationalError as e:
+                # Another session added it between the check and the ALTER
+                if "duplicate column" not in str(e).lower():
+                    raise
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_ch_has_amount ON chat_history(has_amount)")
+
+    # WAL lets the admin panel read while the chatbot writes
+    cur.execute("PRAGMA journal_mode=WAL")
+
     conn.commit()
     conn.close()
@@ -0,0 +1,42 @@
+# database/export.py
+
+def arrow_type(declared):
+    """Arrow type for a SQLite declared column type (SQLite affinity rules)"""
+    import pyarrow as pa
+
+    decl = (declared or "").upper()
+    if "INT" in decl:
+        return pa.int64()
+    if any(t in decl for t in ("CHAR", "CLOB", "TEXT")):
+        return pa.string()
+    if not decl or "BLOB" in decl:
+        return pa.binary()
+    return pa.float64()
+
+
+def arrow_schema(conn, table, columns):
+    """Schema from PRAGMA table_info, so it never depends on which rows come first"""
+    import pyarrow as pa
+
+    declared = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+    return pa.schema([(c, arrow_type(declared.get(c))) for c in columns])
+
+
+def write_parquet(conn, table, columns, out, chunk_rows=10_000):
+    """Stream the selected columns of a table into a Parquet file object"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(conn, table, columns)
+    cols = ", ".join(f'"{c}"' for c in columns)
+    cur = conn.execute(f"SELECT {cols} FROM {table}")
+    with pq.ParquetWriter(out, schema) as writer:
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            arrays = [
+                pa.array([row[i] for row in rows], type=field.type)
+                for i, field in enumerate(schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
@@ -1,28 +1,40 @@
 
 # dialogue_manager/dialogue_handler.py
 
+import json
+import re
+
 from database.bank_crud import (
     get_account,
     transfer_money,
-    list_accounts
+    list_accounts_excluding
 )
-from database.db import get_conn
+from database.db import HistoryWriter
+
+_AMOUNT_DIGIT_RE = re.compile(r"\d+")
+
+_LOG_STMT_SQL = """
+    INSERT INTO chat_history (user_query, predicted_intent, confidence, entities, success)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Shared buffered writer for chat_history (one per process)
+_history_writer = HistoryWriter(_LOG_STMT_SQL)
 
 
 def log_interaction(user_text, intent, confidence=0.85, entities=None, success=True):
     """Log every interaction to chat_history for admin panel"""
-    conn = get_conn()
     real_intent = intent if intent else "unknown"
     
-    # Convert entities list to string for storage
-    entities_str = str(entities) if entities else ""
+    # Store entities as a JSON object of value lists keyed by label, e.g.
+    # {"ACCOUNT_NUMBER": ["1234", "5678"]}, so repeated labels are kept and
+    # SQLite's JSON1 functions (has_amount column) can read it
+    grouped = {}
+    for e in entities or []:
+        grouped.setdefault(e["entity"], []).append(e["value"])
+    entities_str = json.dumps(grouped, ensure_ascii=False) if grouped else ""
     
-    conn.execute("""
-        INSERT INTO chat_history (user_query, predicted_intent, confidence, entities, success)
-        VALUES (?, ?, ?, ?, ?)
-    """, (user_text, real_intent, confidence, entities_str, 1 if success else 0))
-    conn.commit()
-    conn.close()
+    _history_writer.log((user_text, real_intent, confidence, entities_str, 1 if success else 0))
 
 
 class DialogueManager:
@@ -96,11 +108,7 @@ class DialogueManager:
             self.slots["password"] = user_text
             self.awaiting = None
 
-            accounts = list_accounts()
-            receivers = [
-                f"{u} ({a})" for a, u in accounts
-                if a != self.slots["from_account"]
-            ]
+            receivers = list_accounts_excluding(self.slots["from_account"])
             self.awaiting = "receiver"
             return "Select receiver account:\n" + "\n".join(receivers)
 
@@ -205,6 +213,10 @@ class DialogueManager:
 
     # ================= HELPERS =================
     def _parse_amount(self, text):
-        import re
-        match = re.search(r"\d+", text.replace(",", ""))
+        cleaned = text.replace(",", "")
+        # Fast path: the reply is usually just the number ("5000", "5,000")
+        stripped = cleaned.strip()
+        if stripped.isdecimal():
+            return int(stripped)
+        match = _AMOUNT_DIGIT_RE.search(cleaned)
         return int(match.group()) if match else None
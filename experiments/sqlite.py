@@ -72,28 +72,31 @@
 import sqlite3
 
 conn = sqlite3.connect("employee.db")
-cursor = conn.cursor()
-
-cursor.executemany("""
-INSERT INTO departments (department_id, department_name)
-VALUES (?, ?)
-""", [
-    (1, "HR"),
-    (2, "IT"),
-    (3, "Finance")
-])
-
-cursor.executemany("""
-INSERT INTO employees (emp_name, age, salary, join_date, department_id)
-VALUES (?, ?, ?, ?, ?)
-""", [
-    ("Ajay", 25, 50000, "2022-01-10", 2),
-    ("Ravi", 30, 80000, "2021-03-15", 2),
-    ("Kiran", 28, 45000, "2023-06-01", 1),
-    ("Sneha", 35, 70000, "2020-09-20", 3)
-])
-
-conn.commit()
+# Seed script: speed over durability
+conn.execute("PRAGMA journal_mode=WAL")
+conn.execute("PRAGMA synchronous=OFF")
+
+# One transaction for both inserts (commits on success, rolls back on error)
+with conn:
+    conn.executemany("""
+    INSERT INTO departments (department_id, department_name)
+    VALUES (?, ?)
+    """, [
+        (1, "HR"),
+        (2, "IT"),
+        (3, "Finance")
+    ])
+
+    conn.executemany("""
+    INSERT INTO employees (emp_name, age, salary, join_date, department_id)
+    VALUES (?, ?, ?, ?, ?)
+    """, [
+        ("Ajay", 25, 50000, "2022-01-10", 2),
+        ("Ravi", 30, 80000, "2021-03-15", 2),
+        ("Kiran", 28, 45000, "2023-06-01", 1),
+        ("Sneha", 35, 70000, "2020-09-20", 3)
+    ])
+
 conn.close()
 
 print("Data inserted")
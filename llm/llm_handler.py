@@ -1,12 +1,31 @@
 # # llm/llm_handler.py
 
 import os
+from collections import OrderedDict
+import httpx
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage
 
 load_dotenv()
 
+CACHE_SIZE = 256
+
+_http_client = None
+
+def _get_http_client():
+    """One keep-alive pool for every session, so TLS handshakes are reused"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+    return _http_client
+
+def _normalize(user_query):
+    return " ".join(user_query.lower().split())
+
 class LLMHandler:
     def __init__(self):
         api_key = os.getenv("GROQ_API_KEY")
@@ -16,11 +35,14 @@ class LLMHandler:
         self.llm = ChatGroq(
             model="openai/gpt-oss-120b", # openai/gpt-oss-120b, llama-3.1-8b-instant
             temperature=0.3,
-            api_key=api_key
+            api_key=api_key,
+            http_client=_get_http_client()
         )
+        # Answers to out-of-scope questions, keyed on the normalized query
+        self._cache = OrderedDict()
 
-    def generate(self, user_query: str) -> str:
-        response = self.llm.invoke([
+    def _messages(self, user_query):
+        return [
             HumanMessage(
                 content=f"""
 Answer the following user question clearly and factually.
@@ -30,5 +52,38 @@ Question:
 {user_query}
 """
             )
-        ])
-        return response.content
+        ]
+
+    def _cached(self, key):
+        answer = self._cache.get(key)
+        if answer is not None:
+            self._cache.move_to_end(key)
+        return answer
+
+    def _remember(self, key, answer):
+        self._cache[key] = answer
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def generate(self, user_query: str) -> str:
+        key = _normalize(user_query)
+        answer = self._cached(key)
+        if answer is None:
+            answer = self.llm.invoke(self._messages(user_query)).content
+            self._remember(key, answer)
+        return answer
+
+    def stream(self, user_query: str):
+        """Yield the answer chunk by chunk (a cached answer comes as one chunk)"""
+        key = _normalize(user_query)
+        answer = self._cached(key)
+        if answer is not None:
+            yield answer
+            return
+
+        parts = []
+        for chunk in self.llm.stream(self._messages(user_query)):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+        self._remember(key, "".join(parts))
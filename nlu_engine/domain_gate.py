@@ -1,15 +1,21 @@
-BANK_KEYWORDS = {
+import re
+
+BANK_KEYWORDS = frozenset({
     "account", "balance", "transfer", "money", "send", "receive",
     "card", "debit", "credit", "atm", "bank", "withdraw", "deposit",
     "pin", "password"
-}
+})
 
-BANK_ENTITIES = {
+BANK_ENTITIES = frozenset({
     "ACCOUNT_NUMBER",
     "AMOUNT",
     "CARD_TYPE",
     "ACCOUNT_TYPE"
-}
+})
+
+# All keywords in one compiled alternation -> a single scan of the text.
+# No \b anchors: keeps the old substring behaviour ("accounts", "transferring").
+_KW_RE = re.compile("|".join(re.escape(k) for k in sorted(BANK_KEYWORDS)), re.I)
 
 
 def is_banking_query(text: str, entities: list) -> bool:
@@ -19,10 +25,8 @@ def is_banking_query(text: str, entities: list) -> bool:
     - Entity-based
     """
 
-    text_l = text.lower()
-
     # Signal 1: Keyword presence
-    keyword_hit = any(k in text_l for k in BANK_KEYWORDS)
+    keyword_hit = _KW_RE.search(text) is not None
 
     # Signal 2: Entity presence
     entity_hit = any(
@@ -4,39 +4,141 @@
 
 import os
 import json
+import threading
+
+ONNX_MODEL_FILE = "model_int8.onnx"
+MAX_LENGTH = 32
 
 class IntentClassifier:
-    def __init__(self, model_dir="models/intent_model"):
+    def __init__(self, model_dir="models/intent_model", quantize=False):
         if not os.path.isdir(model_dir):
             raise FileNotFoundError(f"Model dir {model_dir} not found. Train the model first.")
         self.model_dir = model_dir
+        self.quantize = quantize
+        # Tokenizer / model are loaded on the first predict()
+        self.session = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        # Fast tokenizers switch padding per call and raise "Already borrowed"
+        # when used from two threads at once (background warm-up vs chat)
+        self._infer_lock = threading.Lock()
+
+        # load id2label
+        with open(os.path.join(model_dir, "id2label.json"), "r", encoding="utf-8") as f:
+            self.id2label = json.load(f)
+        # Dense label list: predictions index it directly with the class id
+        self.id2label_list = [self.id2label[str(i)] for i in range(len(self.id2label))]
+
+    def _ensure_loaded(self):
+        # Double-checked: concurrent first predictions (Streamlit session
+        # threads) load the model once
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load()
+
+    def _load(self):
         # Delayed imports
         try:
-            from transformers import AutoTokenizer, AutoModelForSequenceClassification
-            import torch
+            from transformers import AutoTokenizer
             import numpy as np
+        except Exception as e:
+            raise RuntimeError("Failed to import transformers/numpy. Ensure your environment has them installed.") from e
+
+        self.np = np
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+
+        # Prefer the int8 ONNX export (train_intent.py --export_onnx) when present
+        self.session = self._load_onnx(os.path.join(self.model_dir, ONNX_MODEL_FILE))
+        if self.session is None:
+            self._load_torch(self.model_dir, self.quantize)
+        self._loaded = True
+
+    def _load_onnx(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            return None
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+
+    def _load_torch(self, model_dir, quantize):
+        try:
+            from transformers import AutoModelForSequenceClassification
+            import torch
         except Exception as e:
             raise RuntimeError("Failed to import transformers/torch. Ensure your environment has them installed.") from e
 
-        self._torch = __import__("torch")
-        self.np = __import__("numpy")
-        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self._torch = torch
+        # Leave half the cores to Streamlit / SQLite on CPU-only hosts
+        torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
         self.model = AutoModelForSequenceClassification.from_pretrained(model_dir)
-        # load id2label
-        with open(os.path.join(model_dir, "id2label.json"), "r", encoding="utf-8") as f:
-            self.id2label = json.load(f)
+        if quantize:
+            # Dynamic int8 weights for the Linear layers (faster CPU inference)
+            self.model = self._torch.quantization.quantize_dynamic(
+                self.model, {self._torch.nn.Linear}, dtype=self._torch.qint8
+            )
+        else:
+            self.model = self._to_bettertransformer(self.model)
+        self.model.eval()
 
-    def predict(self, text, top_k=1):
-        inputs = self.tokenizer(text, truncation=True, padding=True, return_tensors="pt")
-        with self._torch.no_grad():
+    def _to_bettertransformer(self, model):
+        # Fused attention fastpath; optional (optimum) and skipped for the int8
+        # model, whose quantized Linear layers it cannot convert
+        try:
+            from optimum.bettertransformer import BetterTransformer
+            return BetterTransformer.transform(model)
+        except Exception:
+            return model
+
+    def _logits_onnx(self, inputs):
+        feed = {
+            "input_ids": inputs["input_ids"].astype(self.np.int64),
+            "attention_mask": inputs["attention_mask"].astype(self.np.int64),
+        }
+        return self.session.run(["logits"], feed)[0]
+
+    def _logits_torch(self, inputs):
+        with self._torch.inference_mode():
             outputs = self.model(**inputs)
-            logits = outputs.logits.squeeze().cpu().numpy()
-            probs = self._torch.softmax(self._torch.tensor(logits), dim=0).numpy()
-            top_idx = self.np.argsort(probs)[::-1][:top_k]
-            results = []
-            for idx in top_idx:
-                results.append({"intent": self.id2label[str(int(idx))], "score": float(probs[int(idx)])})
-            return results
+        return outputs.logits.cpu().numpy()
+
+    def _logits(self, texts, **tok_kwargs):
+        # 2-D (batch, num_labels) logits from whichever backend is loaded
+        with self._infer_lock:
+            if self.session is not None:
+                return self._logits_onnx(self.tokenizer(texts, return_tensors="np", **tok_kwargs))
+            return self._logits_torch(self.tokenizer(texts, return_tensors="pt", **tok_kwargs))
+
+    def _softmax(self, logits):
+        # numpy softmax on the logits (no round-trip back into a torch tensor)
+        exp = self.np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def _top_k(self, probs, top_k):
+        top_idx = self.np.argsort(probs)[::-1][:top_k]
+        return [
+            {"intent": self.id2label_list[idx], "score": float(probs[idx])}
+            for idx in top_idx.tolist()
+        ]
+
+    def predict(self, text, top_k=1):
+        self._ensure_loaded()
+        # Chat utterances are short; a single example needs no padding
+        logits = self._logits([text], truncation=True, padding=False, max_length=MAX_LENGTH)
+        return self._top_k(self._softmax(logits)[0], top_k)
+
+    def predict_batch(self, texts, top_k=1):
+        """predict() over a list of texts with one tokenizer call and one forward pass"""
+        if not texts:
+            return []
+        self._ensure_loaded()
+        logits = self._logits(list(texts), truncation=True, padding=True, max_length=MAX_LENGTH)
+        return [self._top_k(probs, top_k) for probs in self._softmax(logits)]
 
 if __name__ == "__main__":
     try:
@@ -1,19 +1,132 @@
-
 # nlu_engine/nlu_router.py
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+
 from nlu_engine.infer_intent import IntentClassifier
 from nlu_engine.entity_extractor import EntityExtractor
 
 MODEL_DIR = "models/intent_model"
+INTENTS_PATH = "nlu_engine/intents.json"
+PREDICTION_CACHE_SIZE = 2048
+WARM_BATCH_SIZE = 32
+
+logger = logging.getLogger(__name__)
+
+# DialogueManager.awaiting values whose reply is read straight from the text
+AWAITING_SLOTS = frozenset({"amount", "password", "receiver", "account", "card_type"})
+
+# Exact (normalized) utterances answered without the model; "cancel" mirrors
+# the DialogueManager's global cancel words, which it handles by text anyway
+_FAST_INTENTS = {
+    "hi": "greet",
+    "hello": "greet",
+    "hey": "greet",
+    "thanks": "greet",
+    "thank you": "greet",
+    "cancel": "cancel",
+    "stop": "cancel",
+    "exit": "cancel",
+}
+
+
+def model_version(model_dir=MODEL_DIR):
+    """Changes whenever training writes a new model, used as a cache key"""
+    label_file = os.path.join(model_dir, "id2label.json")
+    return os.path.getmtime(label_file) if os.path.exists(label_file) else 0
+
+
+def normalize_text(text):
+    """Cache key for predictions: lowercase, collapse whitespace"""
+    return " ".join(text.lower().split())
+
 
 class NLUProcessor:
-    def __init__(self):
+    def __init__(self, prewarm=False):
         self.intent_model = IntentClassifier(model_dir=MODEL_DIR)
         self.entity_extractor = EntityExtractor()
+        # Repeated queries ("check balance", "hi") skip the transformer;
+        # normalized text -> (intent, score), least recently used evicted
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        if prewarm:
+            # Warm in the background so the first render doesn't wait on it
+            threading.Thread(target=self._warm_in_background, daemon=True).start()
 
-    def process(self, text):
-        intent_res = self.intent_model.predict(text, top_k=1)[0]
-        intent = intent_res["intent"]
-        confidence = intent_res["score"]
+    def _predict_intent(self, text_norm):
+        intent_res = self.intent_model.predict(text_norm, top_k=1)[0]
+        return intent_res["intent"], intent_res["score"]
+
+    def _remember(self, text_norm, result):
+        with self._cache_lock:
+            self._cache[text_norm] = result
+            self._cache.move_to_end(text_norm)
+            if len(self._cache) > PREDICTION_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _predict_cached(self, text_norm):
+        with self._cache_lock:
+            result = self._cache.get(text_norm)
+            if result is not None:
+                self._cache.move_to_end(text_norm)
+                return result
+        result = self._predict_intent(text_norm)
+        self._remember(text_norm, result)
+        return result
+
+    def warm_cache(self, intents_path=INTENTS_PATH):
+        """Pre-fill the prediction cache with the training examples (batched)"""
+        if not os.path.exists(intents_path):
+            return
+        with open(intents_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        examples = {
+            normalize_text(ex)
+            for intent in data.get("intents", [])
+            for ex in intent.get("examples", [])
+        }
+        with self._cache_lock:
+            pending = [ex for ex in examples if ex not in self._cache]
+        pending = pending[:PREDICTION_CACHE_SIZE]
+        for i in range(0, len(pending), WARM_BATCH_SIZE):
+            batch = pending[i:i + WARM_BATCH_SIZE]
+            for text_norm, preds in zip(batch, self.intent_model.predict_batch(batch)):
+                self._remember(text_norm, (preds[0]["intent"], preds[0]["score"]))
+
+    def _warm_in_background(self):
+        try:
+            self.warm_cache()
+        except Exception:
+            logger.exception("Prediction cache warm-up failed")
+
+    def process(self, text, dialogue_state=None):
+        # Mid-flow replies (a bare amount, password, account number...) are
+        # parsed by the DialogueManager itself: skip the model and extractor
+        if dialogue_state is not None and dialogue_state.awaiting in AWAITING_SLOTS:
+            return dialogue_state.active_intent, 1.0, []
+
+        text_norm = normalize_text(text)
+        fast_intent = _FAST_INTENTS.get(text_norm)
+        if fast_intent is not None:
+            return fast_intent, 1.0, []
+
+        intent, confidence = self._predict_cached(text_norm)
         entities = self.entity_extractor.extract(text)
         return intent, confidence, entities
-      
+
+
+_processor = None
+_processor_version = None
+
+def get_nlu_processor(version=None, prewarm=False):
+    """Process-wide NLUProcessor, rebuilt (fresh model + prediction cache)
+    whenever the model version changes"""
+    global _processor, _processor_version
+    if version is None:
+        version = model_version()
+    if _processor is None or _processor_version != version:
+        _processor = NLUProcessor(prewarm=prewarm)
+        _processor_version = version
+    return _processor
@@ -27,36 +27,23 @@ def load_intents(path):
 
     return texts, labels, label2id, id2label
 
-def encode_data(tokenizer, texts, labels):
-    import torch
-    enc = tokenizer(
-        texts,
-        truncation=True,
-        padding=True,
-        max_length=128,
-        return_tensors="pt"
-    )
-    return {
-        "input_ids": enc["input_ids"],
-        "attention_mask": enc["attention_mask"],
-        "labels": torch.tensor(labels)
-    }
-
 class SimpleDataset(object):
-    def __init__(self, enc):
-        self.enc = enc
+    """Tokenizes one example at a time; DataCollatorWithPadding pads each batch"""
+    def __init__(self, tokenizer, texts, labels, max_length=64):
+        self.tokenizer = tokenizer
+        self.texts = texts
+        self.labels = labels
+        self.max_length = max_length
 
     def __len__(self):
-        return len(self.enc["labels"])
+        return len(self.labels)
 
     def __getitem__(self, idx):
-        return {
-            "input_ids": self.enc["input_ids"][idx],
-            "attention_mask": self.enc["attention_mask"][idx],
-            "labels": self.enc["labels"][idx]
-        }
+        item = self.tokenizer(self.texts[idx], truncation=True, max_length=self.max_length)
+        item["labels"] = self.labels[idx]
+        return item
 
-def build_training_args(TrainingArgumentsClass, out_dir, epochs, batch_size, lr):
+def build_training_args(TrainingArgumentsClass, out_dir, epochs, batch_size, lr, use_cuda=False):
     modern_kwargs = dict(
         output_dir=out_dir,
         num_train_epochs=epochs,
@@ -67,6 +54,9 @@ def build_training_args(TrainingArgumentsClass, out_dir, epochs, batch_size, lr)
         save_strategy="epoch",
         load_best_model_at_end=True,
         logging_dir=os.path.join(out_dir, "logs"),
+        # mixed precision + pinned host memory only pay off on a GPU
+        fp16=use_cuda,
+        dataloader_pin_memory=use_cuda,
     )
     try:
         return TrainingArgumentsClass(**modern_kwargs)
@@ -131,6 +121,32 @@ def choose_train_test_split(texts, labels, default_frac=0.2):
 
     return train_txt, val_txt, train_lbl, val_lbl
 
+def export_onnx(model, tokenizer, out_dir):
+    """Export the fine-tuned model to ONNX and write a dynamic-int8 copy for CPU inference"""
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    int8_path = os.path.join(out_dir, "model_int8.onnx")
+
+    model = model.to("cpu").eval()
+    dummy = tokenizer("transfer 500 to account 12345678", return_tensors="pt")
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"]),
+        fp32_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=14,
+    )
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print("ONNX int8 model exported to:", int8_path)
+
 def train(args):
     try:
         import torch
@@ -158,11 +174,8 @@ def train(args):
         val_txt = train_txt[:1]
         val_lbl = train_lbl[:1]
 
-    train_enc = encode_data(tokenizer, train_txt, train_lbl)
-    val_enc = encode_data(tokenizer, val_txt, val_lbl)
-
-    train_ds = SimpleDataset(train_enc)
-    val_ds = SimpleDataset(val_enc)
+    train_ds = SimpleDataset(tokenizer, train_txt, train_lbl)
+    val_ds = SimpleDataset(tokenizer, val_txt, val_lbl)
 
     model = AutoModelForSequenceClassification.from_pretrained(
         args.model_name,
@@ -170,29 +183,44 @@ def train(args):
     )
 
     TrainingArgumentsClass = TrainingArguments
-    training_args = build_training_args(TrainingArgumentsClass, args.output_dir, args.epochs, args.batch_size, args.lr)
+    training_args = build_training_args(
+        TrainingArgumentsClass, args.output_dir, args.epochs, args.batch_size, args.lr,
+        use_cuda=torch.cuda.is_available()
+    )
 
     from sklearn.model_selection import train_test_split  # keep mt imports local
-    from transformers import Trainer
+    from transformers import Trainer, DataCollatorWithPadding
 
     trainer = Trainer(
         model=model,
         args=training_args,
         train_dataset=train_ds,
         eval_dataset=val_ds,
-        tokenizer=tokenizer
+        tokenizer=tokenizer,
+        data_collator=DataCollatorWithPadding(tokenizer)
     )
 
     print("Starting training...")
     trainer.train()
 
     os.makedirs(args.output_dir, exist_ok=True)
+    # Don't let inference pick up an ONNX export of a previous model
+    for name in ("model.onnx", "model_int8.onnx"):
+        stale = os.path.join(args.output_dir, name)
+        if os.path.exists(stale):
+            os.remove(stale)
+
     model.save_pretrained(args.output_dir)
     tokenizer.save_pretrained(args.output_dir)
 
     with open(os.path.join(args.output_dir, "label2id.json"), "w", encoding="utf-8") as f:
         json.dump(label2id, f)
 
+    if args.export_onnx:
+        export_onnx(model, tokenizer, args.output_dir)
+
+    # Written last: its mtime is the model version the app reloads on
+    # (nlu_router.model_version), so every other file must be in place first
     with open(os.path.join(args.output_dir, "id2label.json"), "w", encoding="utf-8") as f:
         json.dump(id2label, f)
 
@@ -206,5 +234,7 @@ if __name__ == "__main__":
     parser.add_argument("--epochs", type=int, default=2)
     parser.add_argument("--batch_size", type=int, default=8)
     parser.add_argument("--lr", type=float, default=2e-5)
+    parser.add_argument("--export_onnx", action="store_true",
+                        help="Also export an int8 ONNX model (needs onnx + onnxruntime)")
     args = parser.parse_args()
     train(args)
@@ -4,10 +4,188 @@ Query Analytics Page - Dynamically tracks NLU predictions in real-time
 Shows metrics and recent queries from nlu_history table
 """
 
+import numpy as np
 import streamlit as st
 import pandas as pd
-from database.db import get_conn
-from datetime import datetime
+from database.db import read_conn, HistoryWriter
+
+try:
+    import polars as pl  # builds the recent-queries table straight into Arrow
+except ImportError:
+    pl = None
+
+# Long free-text queries are cut to this many characters in the recent table
+QUERY_PREVIEW_CHARS = 120
+RECENT_PAGE_ROWS = 50
+
+_NLU_LOG_SQL = """
+    INSERT INTO nlu_history (user_query, predicted_intent, confidence)
+    VALUES (?, ?, ?)
+"""
+
+# Hot statements as module constants: the same SQL string every call keeps
+# hitting sqlite3's per-connection statement cache (cached_statements=256)
+_SENTINEL_SQL = "SELECT COALESCE(MAX(id), 0), (SELECT total FROM nlu_stats) FROM nlu_history"
+
+# Trigger-maintained totals (see init_db): one row instead of a table scan
+_METRICS_SQL = """
+    SELECT total, (SELECT COUNT(*) FROM nlu_intents), low_conf
+    FROM nlu_stats
+"""
+
+# Keyset pagination: older pages continue below the last id shown (rowid
+# range search) instead of an OFFSET that re-walks every newer row
+_RECENT_SQL = """
+    SELECT id, substr(user_query, 1, ?) AS user_query, predicted_intent, confidence, timestamp
+    FROM nlu_history
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+_OLDER_SQL = """
+    SELECT id, substr(user_query, 1, ?) AS user_query, predicted_intent, confidence, timestamp
+    FROM nlu_history
+    WHERE id < ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+_nlu_writer = HistoryWriter(_NLU_LOG_SQL, max_batch=100, flush_sec=0.2)
+
+
+# CSS Styling for gradient background and cards
+_CSS = """
+<style>
+/* Gradient Background */
+.stApp {
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 25%, #f093fb 50%, #4facfe 75%, #00f2fe 100%) !important;
+}
+
+/* Metric Cards */
+[data-testid="metric-container"] {
+    background: rgba(255, 255, 255, 0.15) !important;
+    backdrop-filter: blur(10px) !important;
+    border: 1px solid rgba(255, 255, 255, 0.3) !important;
+    border-radius: 16px !important;
+    padding: 20px !important;
+    box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1) !important;
+}
+
+[data-testid="stMetricLabel"] {
+    color: #ffffff !important;
+    font-weight: 600 !important;
+    font-size: 14px !important;
+}
+
+[data-testid="stMetricValue"] {
+    color: #ffffff !important;
+    font-size: 32px !important;
+    font-weight: 800 !important;
+    text-shadow: 0 2px 10px rgba(0,0,0,0.3) !important;
+}
+
+/* Table Styling */
+[data-testid="stDataFrame"] {
+    background: rgba(255, 255, 255, 0.95) !important;
+    border-radius: 12px !important;
+    padding: 10px !important;
+    box-shadow: 0 8px 32px rgba(0, 0, 0, 0.15) !important;
+}
+
+/* Section Headers */
+h3 {
+    color: #ffffff !important;
+    text-shadow: 0 2px 8px rgba(0,0,0,0.2) !important;
+    font-weight: 700 !important;
+}
+
+/* Buttons */
+.stButton button {
+    background: rgba(255, 255, 255, 0.2) !important;
+    color: white !important;
+    border: 2px solid rgba(255, 255, 255, 0.5) !important;
+    border-radius: 8px !important;
+    font-weight: 600 !important;
+    backdrop-filter: blur(10px) !important;
+}
+
+.stButton button:hover {
+    background: rgba(255, 255, 255, 0.3) !important;
+    border-color: white !important;
+}
+</style>
+"""
+
+
+# Each logged row changes the sentinel: keep only the last few results
+@st.cache_data(show_spinner=False, max_entries=4)
+def _fetch_metrics(sentinel):
+    """(total, distinct intents, low confidence); sentinel = (MAX(id), row count)"""
+    with read_conn() as conn:
+        return conn.execute(_METRICS_SQL).fetchone()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _fetch_recent(sentinel, before_id=None):
+    """(display frame, oldest id on the page) for the next page below before_id"""
+    # One extra row tells whether an older page exists
+    limit = RECENT_PAGE_ROWS + 1
+    with read_conn() as conn:
+        if before_id is None:
+            cur = conn.execute(_RECENT_SQL, (QUERY_PREVIEW_CHARS, limit))
+        else:
+            cur = conn.execute(_OLDER_SQL, (QUERY_PREVIEW_CHARS, before_id, limit))
+        columns = [d[0] for d in cur.description]
+        rows = cur.fetchall()
+
+    oldest_id = None
+    if len(rows) > RECENT_PAGE_ROWS:
+        rows = rows[:RECENT_PAGE_ROWS]
+        oldest_id = rows[-1][0]
+    if pl is not None:
+        return _format_recent_polars(rows, columns), oldest_id
+    return _format_recent_pandas(rows, columns), oldest_id
+
+
+def _format_recent_polars(rows, columns):
+    """Display table as a pyarrow Table (st.dataframe takes it as-is)"""
+    df = pl.DataFrame(rows, schema=columns, orient="row")
+    return df.select(
+        pl.col("user_query").alias("Query"),
+        pl.col("predicted_intent").alias("Intent"),
+        pl.concat_str([
+            (pl.col("confidence").cast(pl.Float64) * 100).round(0).cast(pl.Int64).cast(pl.Utf8),
+            pl.lit("%"),
+        ]).alias("Confidence"),
+        # 'YYYY-MM-DD HH:MM' from both CURRENT_TIMESTAMP and isoformat() values
+        pl.col("timestamp").cast(pl.Utf8).str.slice(0, 16).str.replace("T", " ").alias("Date"),
+    ).to_arrow()
+
+
+def _format_recent_pandas(rows, columns):
+    df = pd.DataFrame.from_records(rows, columns=columns)
+
+    # Format for display in pandas (vectorized) rather than per row in SQL
+    confidence = pd.to_numeric(df["confidence"], errors="coerce").to_numpy(dtype=float)
+    missing = np.isnan(confidence)
+    percent = np.rint(np.where(missing, 0.0, confidence) * 100).astype(np.int16)
+    timestamp = pd.to_datetime(df["timestamp"], format="ISO8601", errors="coerce")
+    return pd.DataFrame({
+        "Query": df["user_query"],
+        "Intent": df["predicted_intent"],
+        "Confidence": np.where(missing, None, np.char.add(percent.astype(str), "%")),
+        "Date": timestamp.dt.strftime("%Y-%m-%d %H:%M"),
+    }).convert_dtypes(dtype_backend="pyarrow")  # Arrow-native for st.dataframe
+
+
+def _set_last_id(last_id):
+    st.session_state.nlu_last_id = last_id
+
+
+def _refresh_recent():
+    # Runs before the rerun the click triggers; cached metrics stay warm
+    _fetch_recent.clear()
+    st.session_state.nlu_last_id = None
 
 
 def page_query_analytics():
@@ -16,87 +194,15 @@ def page_query_analytics():
     # Page Title with Icon
     st.markdown("## 🔍 Query Analytics")
     
-    # CSS Styling for gradient background and cards
-    st.markdown("""
-    <style>
-    /* Gradient Background */
-    .stApp {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 25%, #f093fb 50%, #4facfe 75%, #00f2fe 100%) !important;
-    }
-    
-    /* Metric Cards */
-    [data-testid="metric-container"] {
-        background: rgba(255, 255, 255, 0.15) !important;
-        backdrop-filter: blur(10px) !important;
-        border: 1px solid rgba(255, 255, 255, 0.3) !important;
-        border-radius: 16px !important;
-        padding: 20px !important;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1) !important;
-    }
+    # CSS Styling for gradient background and cards (re-emitted every rerun:
+    # Streamlit drops elements a rerun does not render)
+    st.markdown(_CSS, unsafe_allow_html=True)
     
-    [data-testid="stMetricLabel"] {
-        color: #ffffff !important;
-        font-weight: 600 !important;
-        font-size: 14px !important;
-    }
+    # Cheap sentinel: cached results are reused until a row is added/removed
+    with read_conn() as conn:
+        sentinel = conn.execute(_SENTINEL_SQL).fetchone()
     
-    [data-testid="stMetricValue"] {
-        color: #ffffff !important;
-        font-size: 32px !important;
-        font-weight: 800 !important;
-        text-shadow: 0 2px 10px rgba(0,0,0,0.3) !important;
-    }
-    
-    /* Table Styling */
-    [data-testid="stDataFrame"] {
-        background: rgba(255, 255, 255, 0.95) !important;
-        border-radius: 12px !important;
-        padding: 10px !important;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.15) !important;
-    }
-    
-    /* Section Headers */
-    h3 {
-        color: #ffffff !important;
-        text-shadow: 0 2px 8px rgba(0,0,0,0.2) !important;
-        font-weight: 700 !important;
-    }
-    
-    /* Buttons */
-    .stButton button {
-        background: rgba(255, 255, 255, 0.2) !important;
-        color: white !important;
-        border: 2px solid rgba(255, 255, 255, 0.5) !important;
-        border-radius: 8px !important;
-        font-weight: 600 !important;
-        backdrop-filter: blur(10px) !important;
-    }
-    
-    .stButton button:hover {
-        background: rgba(255, 255, 255, 0.3) !important;
-        border-color: white !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    # Database Connection
-    conn = get_conn()
-    
-    # Fetch Metrics from nlu_history
-    total_queries = pd.read_sql(
-        "SELECT COUNT(*) as count FROM nlu_history", 
-        conn
-    ).iloc[0, 0]
-    
-    intents_detected = pd.read_sql(
-        "SELECT COUNT(DISTINCT predicted_intent) as count FROM nlu_history WHERE predicted_intent IS NOT NULL", 
-        conn
-    ).iloc[0, 0]
-    
-    low_confidence = pd.read_sql(
-        "SELECT COUNT(*) as count FROM nlu_history WHERE confidence < 0.7", 
-        conn
-    ).iloc[0, 0]
+    total_queries, intents_detected, low_confidence = _fetch_metrics(sentinel)
     
     # Display Metrics in 3 Columns
     col1, col2, col3 = st.columns(3)
@@ -115,34 +221,38 @@ def page_query_analytics():
     # Recent NLU Queries Section
     st.markdown("### Recent NLU Queries")
     
-    # Refresh Button
-    col_refresh, col_export = st.columns([1, 4])
-    with col_refresh:
-        if st.button("🔄 Refresh"):
-            st.rerun()
+    # Keyset cursor: None = newest page, else show rows with id < nlu_last_id
+    if "nlu_last_id" not in st.session_state:
+        st.session_state.nlu_last_id = None
     
     # Fetch Recent Queries with better date formatting
-    recent_queries = pd.read_sql("""
-        SELECT 
-            user_query as "Query",
-            predicted_intent as "Intent",
-            ROUND(confidence * 100, 0) || '%' as "Confidence",
-            strftime('%Y-%m-%d %H:%M', timestamp) as "Date"
-        FROM nlu_history
-        ORDER BY id DESC
-        LIMIT 50
-    """, conn)
+    recent_queries, page_oldest = _fetch_recent(sentinel, st.session_state.nlu_last_id)
     
-    conn.close()
+    # Refresh / Paging Buttons (callbacks run before the next fetch)
+    col_refresh, col_older, col_newest, col_export = st.columns([1, 1, 1, 2])
+    with col_refresh:
+        st.button("🔄 Refresh", on_click=_refresh_recent)
+    with col_older:
+        st.button(
+            "⬇️ Older", disabled=page_oldest is None,
+            on_click=_set_last_id, args=(page_oldest,)
+        )
+    with col_newest:
+        st.button(
+            "⬆️ Newest", disabled=st.session_state.nlu_last_id is None,
+            on_click=_set_last_id, args=(None,)
+        )
     
     # Display Table
-    if not recent_queries.empty:
+    if len(recent_queries):
         st.dataframe(
             recent_queries, 
-            use_container_width=True,
+            width='stretch',
             hide_index=True,
             height=400
         )
+    elif st.session_state.nlu_last_id is not None:
+        st.info("📊 No older queries.")
     else:
         st.info("📊 No queries yet. Use the NLU Visualizer in 'User Query' to generate predictions!")
     
@@ -156,14 +266,6 @@ def log_nlu_query(user_query: str, predicted_intent: str, confidence: float):
     Log NLU prediction to nlu_history table
     Call this function after every NLU prediction in User Query page
     """
-    conn = get_conn()
-    try:
-        conn.execute("""
-            INSERT INTO nlu_history (user_query, predicted_intent, confidence, timestamp)
-            VALUES (?, ?, ?, ?)
-        """, (user_query, predicted_intent, confidence, datetime.now().isoformat()))
-        conn.commit()
-    except Exception as e:
-        print(f"Error logging NLU query: {e}")
-    finally:
-        conn.close()
+    # Queued; the background writer inserts it with the next batch and
+    # timestamp comes from the column's DEFAULT CURRENT_TIMESTAMP
+    _nlu_writer.log((user_query, predicted_intent, confidence))
@@ -0,0 +1,27 @@
+# tests/test_entity_extractor.py
+
+import pytest
+
+from nlu_engine.entity_extractor import extract
+
+
+def _pairs(text):
+    return [(e["entity"], e["value"]) for e in extract(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("txn 5000.50 rs", [("TXN_ID", "5000")]),
+    ("utr 998877.50 rupees", [("TXN_ID", "998877")]),
+    ("account 12345.50 rs", [("ACCOUNT_NUMBER", "12345")]),
+])
+def test_no_amount_from_the_tail_of_a_matched_number(text, expected):
+    assert _pairs(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("pay 250 rupees to a/c 55556666", [("AMOUNT", "250"), ("ACCOUNT_NUMBER", "55556666")]),
+    ("INR 300 and USD 40", [("AMOUNT", "300"), ("AMOUNT", "40")]),
+    ("12.5 dollars", [("AMOUNT", "12.5")]),
+])
+def test_amounts_still_extracted(text, expected):
+    assert _pairs(text) == expected
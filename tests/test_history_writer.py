@@ -0,0 +1,69 @@
+# tests/test_history_writer.py
+
+import sqlite3
+
+import pytest
+
+from database import db
+
+INSERT_SQL = "INSERT INTO events (value) VALUES (?)"
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = tmp_path / "bankbot.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+    conn.close()
+    # Point the module at the temp DB with a fresh shared writer connection
+    monkeypatch.setattr(db, "DB_NAME", str(path))
+    monkeypatch.setattr(db, "_writer_conn", None)
+    yield path
+    if db._writer_conn is not None:
+        db._writer_conn.close()
+
+
+@pytest.fixture
+def writer(db_path):
+    # Long flush window so rows logged back to back land in one batch
+    writer = db.HistoryWriter(INSERT_SQL, flush_sec=0.5)
+    yield writer
+    writer.close()
+
+
+def values(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT value FROM events ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_batch_is_written(writer, db_path):
+    for value in ("a", "b", "c"):
+        writer.log((value,))
+    writer.flush()
+    assert values(db_path) == ["a", "b", "c"]
+
+
+def test_bad_row_loses_only_that_row(writer, db_path):
+    writer.log(("a",))
+    writer.log((None,))  # NOT NULL violation fails the whole batch
+    writer.log(("c",))
+    writer.flush()
+    assert values(db_path) == ["a", "c"]
+
+
+def test_log_after_close_still_writes(writer, db_path):
+    writer.log(("a",))
+    writer.close()
+    writer.close()  # idempotent
+    writer.log(("b",))
+    assert values(db_path) == ["a", "b"]
+
+
+def test_flush_returns_after_close(writer, db_path):
+    writer.close()
+    writer.log(("a",))
+    writer.flush()
+    assert values(db_path) == ["a"]
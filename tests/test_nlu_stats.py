@@ -0,0 +1,77 @@
+# tests/test_nlu_stats.py
+
+import sqlite3
+
+import pytest
+
+from database import db
+
+ROWS = [
+    ("check balance", "check_balance", 0.95),
+    ("send money", "transfer_money", 0.4),
+    ("balance pls", "check_balance", 0.6),
+]
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    path = tmp_path / "bankbot.db"
+    monkeypatch.setattr(db, "DB_NAME", str(path))
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+
+def insert(conn, rows):
+    conn.executemany(
+        "INSERT INTO nlu_history (user_query, predicted_intent, confidence) VALUES (?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+
+
+def stats(conn):
+    total, low_conf = conn.execute("SELECT total, low_conf FROM nlu_stats").fetchone()
+    intents = dict(conn.execute("SELECT intent, cnt FROM nlu_intents"))
+    return total, low_conf, intents
+
+
+def scanned(conn):
+    total, low_conf = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(confidence < 0.7), 0) FROM nlu_history"
+    ).fetchone()
+    intents = dict(conn.execute(
+        "SELECT predicted_intent, COUNT(*) FROM nlu_history GROUP BY predicted_intent"
+    ))
+    return total, low_conf, intents
+
+
+def test_backfill_counts_existing_rows(conn):
+    # nlu_history from before the stats tables existed
+    conn.execute("""
+    CREATE TABLE nlu_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+        user_query TEXT,
+        predicted_intent TEXT,
+        confidence REAL
+    )
+    """)
+    insert(conn, ROWS)
+
+    db.init_db()
+    db.init_db()  # a second run must not backfill again
+
+    assert stats(conn) == (3, 2, {"check_balance": 2, "transfer_money": 1})
+
+
+def test_triggers_track_inserts_and_deletes(conn):
+    db.init_db()
+    assert stats(conn) == (0, 0, {})
+
+    insert(conn, ROWS)
+    assert stats(conn) == scanned(conn)
+
+    conn.execute("DELETE FROM nlu_history WHERE predicted_intent = 'transfer_money'")
+    conn.commit()
+    assert stats(conn) == scanned(conn) == (2, 1, {"check_balance": 2})